@@ -0,0 +1,302 @@
+"""Local stand-ins for the external services, so the pipeline can run with no network.
+
+* FakeGemini   - answers generateContent / streamGenerateContent like the Gemini
+                 REST API, with configurable latency and error rate.
+* FakeFirebase - an in-memory Realtime Database speaking the REST protocol the
+                 Admin SDK uses in emulator mode (GET/PUT/PATCH/DELETE, ETags).
+* ImageServer  - serves deterministic JPEGs with ETag / Last-Modified.
+
+Run standalone with `python stubs.py` to start all three.
+"""
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class _Server:
+    def __init__(self, handler, port=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_port
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def stub(self):
+        return self.server.stub
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if status != 204 and status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and status not in (204, 304):
+            self.wfile.write(body)
+
+
+# --- Gemini ---
+class _GeminiHandler(_Handler):
+    _route = re.compile(r"^/[^/]+/models/([^/:]+):(generateContent|streamGenerateContent)$")
+
+    def do_POST(self):
+        match = self._route.match(urlparse(self.path).path)
+        request = json.loads(self._body() or b"{}")
+        if not match:
+            return self._send(404, b'{"error": {"code": 404, "message": "Not found"}}')
+        stub = self.stub
+        stub.record_call()
+
+        time.sleep(stub.latency())
+        if random.random() < stub.error_rate:
+            body = {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}
+            return self._send(429, json.dumps(body).encode())
+
+        text = stub.answer(request)
+        if match.group(2) == "generateContent":
+            return self._send(200, json.dumps(stub.response(text)).encode())
+
+        # Server-Sent Events, one chunk per few words
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + stub.stream_words]) + " " for i in range(0, len(words), stub.stream_words)]
+        try:
+            for chunk in chunks:
+                time.sleep(stub.stream_interval)
+                payload = f"data: {json.dumps(stub.response(chunk))}\r\n\r\n".encode()
+                self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class FakeGemini(_Server):
+    def __init__(self, latency_ms=500, jitter_ms=100, error_rate=0.0, answer_words=60,
+                 stream_words=5, stream_interval_ms=20, port=0):
+        super().__init__(_GeminiHandler, port)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.answer_words = answer_words
+        self.stream_words = stream_words
+        self.stream_interval = stream_interval_ms / 1000
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def latency(self):
+        return max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def answer(self, request):
+        prompt = ""
+        for content in request.get("contents", []):
+            for part in content.get("parts", []):
+                prompt += part.get("text", "")
+        words = ["This", "is", "a", "synthetic", "answer", "for:", prompt[:40]]
+        words += ["lorem"] * max(0, self.answer_words - len(words))
+        return " ".join(words)
+
+    @staticmethod
+    def response(text):
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": 50,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": 50 + len(text) // 4,
+            },
+            "modelVersion": "fake-gemini",
+        }
+
+
+# --- Firebase Realtime Database ---
+class _FirebaseHandler(_Handler):
+    def _path(self):
+        path = urlparse(self.path).path
+        if path.endswith(".json"):
+            path = path[:-len(".json")]
+        return [p for p in path.split("/") if p]
+
+    def _silent(self):
+        return parse_qs(urlparse(self.path).query).get("print") == ["silent"]
+
+    def do_GET(self):
+        value = self.stub.get(self._path())
+        headers = {}
+        if self.headers.get("X-Firebase-ETag") == "true":
+            headers["ETag"] = self.stub.etag(value)
+        self._send(200, json.dumps(value).encode(), headers=headers)
+
+    def do_PUT(self):
+        path, value = self._path(), json.loads(self._body() or b"null")
+        with self.stub.lock:
+            expected = self.headers.get("if-match")
+            if expected is not None:
+                current = self.stub.get(path)
+                if expected != self.stub.etag(current):
+                    return self._send(412, json.dumps(current).encode(), headers={"ETag": self.stub.etag(current)})
+            self.stub.set(path, value)
+        if self._silent():
+            return self._send(204)
+        self._send(200, json.dumps(value).encode(), headers={"ETag": self.stub.etag(value)})
+
+    def do_PATCH(self):
+        path, updates = self._path(), json.loads(self._body() or b"{}")
+        with self.stub.lock:
+            for key, value in updates.items():
+                self.stub.set(path + [p for p in key.split("/") if p], value)
+        if self._silent():
+            return self._send(204)
+        self._send(200, json.dumps(updates).encode())
+
+    def do_DELETE(self):
+        with self.stub.lock:
+            self.stub.set(self._path(), None)
+        self._send(200, b"null")
+
+
+class FakeFirebase(_Server):
+    def __init__(self, port=0):
+        super().__init__(_FirebaseHandler, port)
+        self.tree = {}
+        self.lock = threading.RLock()
+
+    @property
+    def host(self):
+        return f"127.0.0.1:{self.port}"
+
+    @staticmethod
+    def etag(value):
+        return hashlib.md5(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+    def get(self, path):
+        with self.lock:
+            node = self.tree
+            for key in path:
+                if not isinstance(node, dict) or key not in node:
+                    return None
+                node = node[key]
+            return node
+
+    def set(self, path, value):
+        with self.lock:
+            if not path:
+                self.tree = value if isinstance(value, dict) else {}
+                return
+            node = self.tree
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            if value is None:
+                node.pop(path[-1], None)
+            else:
+                node[path[-1]] = value
+
+
+# --- Image host ---
+class _ImageHandler(_Handler):
+    def do_GET(self):
+        name = urlparse(self.path).path.strip("/")
+        data, etag = self.stub.image(name)
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers={"ETag": etag})
+        self._send(200, data, content_type="image/jpeg",
+                   headers={"ETag": etag, "Last-Modified": self.stub.last_modified})
+
+
+class ImageServer(_Server):
+    def __init__(self, width=1024, height=768, port=0):
+        super().__init__(_ImageHandler, port)
+        self.width = width
+        self.height = height
+        self.last_modified = formatdate(usegmt=True)
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def image(self, name):
+        with self._lock:
+            if name not in self._images:
+                from PIL import Image
+
+                seed = int(hashlib.md5(name.encode()).hexdigest()[:6], 16)
+                color = (seed & 0xFF, (seed >> 8) & 0xFF, (seed >> 16) & 0xFF)
+                buf = io.BytesIO()
+                Image.new("RGB", (self.width, self.height), color).save(buf, format="JPEG", quality=90)
+                data = buf.getvalue()
+                self._images[name] = (data, f'"{hashlib.md5(data).hexdigest()}"')
+            return self._images[name]
+
+    def url_for(self, n):
+        return f"{self.url}/img/{n}.jpg"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start the benchmark stubs")
+    parser.add_argument("--gemini-port", type=int, default=9100)
+    parser.add_argument("--firebase-port", type=int, default=9101)
+    parser.add_argument("--image-port", type=int, default=9102)
+    parser.add_argument("--gemini-latency-ms", type=float, default=500)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    gemini = FakeGemini(latency_ms=args.gemini_latency_ms, error_rate=args.gemini_error_rate, port=args.gemini_port).start()
+    firebase = FakeFirebase(port=args.firebase_port).start()
+    images = ImageServer(port=args.image_port).start()
+    print(f"GEMINI_BASE_URL={gemini.url}")
+    print(f"FIREBASE_DATABASE_EMULATOR_HOST={firebase.host}")
+    print(f"Images: {images.url_for(1)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,23 @@ FIREBASE_CONSOLE_URL = "https://console.firebase.google.com/"
 
 st.set_page_config(page_title="AI SaaS Dashboard", layout="wide")
 
+def wait_for_result(task_id, timeout=60):
+    """Blocks until the Worker finishes the task, using the API's Server-Sent Events stream."""
+    deadline = time.time() + timeout
+    with requests.get(f"{API_URL}/tasks/{task_id}/events", stream=True, timeout=(5, 30)) as res:
+        res.raise_for_status()
+        event = None
+        for line in res.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+                if event == "timeout":
+                    return None
+            elif line.startswith("data:") and event == "completed":
+                return json.loads(line[len("data:"):])
+            if time.time() > deadline:
+                return None
+    return None
+
 # --- Sidebar: Navigation and Testing ---
 with st.sidebar:
     st.header("Quick Links")
@@ -43,18 +60,14 @@ with st.sidebar:
                 rid = data.get("record_id")
                 st.write(f"   -> Task queued. ID: {rid}")
                 
-                # 2. Polling for results
+                # 2. Wait for the completion event (no polling)
                 st.write("2. Waiting for Worker processing...")
                 found = False
-                for i in range(15):
-                    time.sleep(1)
-                    check = requests.get(f"{API_URL}/firebase/{rid}")
-                    if check.status_code == 200:
-                        result_data = check.json().get("result", {})
-                        desc = result_data.get("description", "")
-                        st.write(f"   -> Processing complete! Result: {desc[:30]}...")
-                        found = True
-                        break
+                result_data = wait_for_result(rid, timeout=30)
+                if result_data:
+                    desc = result_data.get("description", "")
+                    st.write(f"   -> Processing complete! Result: {desc[:30]}...")
+                    found = True
                 
                 if found:
                     # 3. Cleanup
@@ -110,11 +123,26 @@ with col1:
                     data = resp.json()
                     new_id = data.get("record_id")
                     st.session_state['last_id'] = new_id
+                    st.session_state.setdefault('my_ids', []).append(new_id)
                     st.success(f"Task Accepted! Task ID: {new_id}")
                 else:
                     st.error(f"Submission failed: {resp.text}")
+                    new_id = None
             except Exception as e:
                 st.error(f"Connection failed: {e}")
+                new_id = None
+
+        if new_id is not None:
+            with st.spinner("Waiting for the Worker to finish..."):
+                try:
+                    result = wait_for_result(new_id)
+                    if result:
+                        st.write("### LLM Description")
+                        st.info(result.get("description", ""))
+                    else:
+                        st.warning("Still processing. Use 'Check Result' later.")
+                except Exception as e:
+                    st.error(f"Connection error: {e}")
 
 with col2:
     st.subheader("View Results")
@@ -142,3 +170,45 @@ with col2:
                     st.error(f"Error fetching result: Status {res.status_code}")
             except Exception as e:
                 st.error(f"Connection error: {e}")
+
+# --- Task Table: one request per refresh (GET /tasks or POST /tasks/status) ---
+st.divider()
+st.subheader("Tasks")
+
+view = st.radio("Show", ["Recent tasks", "My tasks (this session)"], horizontal=True)
+status_filter = st.selectbox("Status", ["all", "queued", "processing", "completed", "failed"])
+live = st.toggle("Live refresh", value=True)
+
+@st.fragment(run_every=3 if live else None)
+def task_table():
+    try:
+        if view == "Recent tasks":
+            params = {"limit": 50}
+            if status_filter != "all":
+                params["status"] = status_filter
+            res = requests.get(f"{API_URL}/tasks", params=params, timeout=5)
+        else:
+            my_ids = st.session_state.get('my_ids', [])
+            if not my_ids:
+                st.info("No tasks submitted in this session yet.")
+                return
+            res = requests.post(f"{API_URL}/tasks/status", json={"ids": my_ids[-200:]}, timeout=5)
+        res.raise_for_status()
+    except Exception as e:
+        st.error(f"Cannot load tasks: {e}")
+        return
+
+    tasks = res.json().get("tasks", [])
+    if status_filter != "all":
+        tasks = [t for t in tasks if t["status"] == status_filter]
+    if not tasks:
+        st.info("No tasks to show.")
+        return
+    st.dataframe(
+        tasks,
+        column_order=["record_id", "status", "priority", "text_prompt", "image_url", "created_at", "started_at", "completed_at"],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+task_table()
@@ -0,0 +1,80 @@
+"""Closed-loop load test for POST /submit_task.
+
+Runs N concurrent clients against the uploader for a fixed duration and prints
+requests/sec and latency percentiles. Run it once on the old build and once on
+the new one to compare, e.g.
+
+    python loadtest.py --concurrency 64 --duration 30
+"""
+import argparse
+import os
+import threading
+import time
+
+import requests
+
+BASE_URL = os.getenv("API_URL", "http://localhost:8000")
+
+
+def run_client(url, payload, stop_at, latencies, errors, lock):
+    session = requests.Session()
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        try:
+            res = session.post(url, json=payload, timeout=30)
+            ok = res.status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors.append(elapsed)
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--prompt", default="Load test prompt")
+    args = parser.parse_args()
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+    payload = {"text_prompt": args.prompt}
+
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(f"{args.url}/submit_task", payload, stop_at, latencies, errors, lock),
+            daemon=True,
+        )
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"Concurrency:  {args.concurrency}")
+    print(f"Duration:     {elapsed:.1f}s")
+    print(f"Requests:     {len(latencies)} ok, {len(errors)} failed")
+    print(f"Throughput:   {len(latencies) / elapsed:.1f} req/s")
+    print(f"Latency p50:  {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"Latency p99:  {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
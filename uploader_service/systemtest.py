@@ -12,17 +12,19 @@ class TestSystemIntegration(unittest.TestCase):
     def setUp(self):
         print(f"\n[Setup] Connecting to API at {BASE_URL}...")
         try:
-            for i in range(5):
+            # /health answers as soon as the process is up; /ready waits for Postgres + RabbitMQ
+            for i in range(30):
                 try:
-                    res = requests.get(f"{BASE_URL}/health", timeout=5)
+                    res = requests.get(f"{BASE_URL}/ready", timeout=5)
                     if res.status_code == 200:
                         print("   -> API is ready!")
                         return
+                    print(f"   -> Waiting for API dependencies {res.json().get('checks')}... ({i+1}/30)")
                 except requests.exceptions.ConnectionError:
-                    print(f"   -> Waiting for API... ({i+1}/5)")
-                    time.sleep(2)
+                    print(f"   -> Waiting for API... ({i+1}/30)")
+                time.sleep(2)
             
-            requests.get(f"{BASE_URL}/health", timeout=5)
+            requests.get(f"{BASE_URL}/ready", timeout=5).raise_for_status()
         except Exception as e:
             self.fail(f"API is not reachable at {BASE_URL}. Error: {e}")
 
@@ -41,30 +43,20 @@ class TestSystemIntegration(unittest.TestCase):
         print(f"   -> Task queued successfully. Record ID: {record_id}")
         self.assertIsNotNone(record_id)
 
-        # 2. Wait Worker
-        print("[Step 2] Waiting for Worker (Polling)...")
-        max_retries = 15
+        # 2. Wait Worker (long-poll: the API answers as soon as the result exists)
+        print("[Step 2] Waiting for Worker (long-poll)...")
+        res = requests.get(f"{BASE_URL}/firebase/{record_id}", params={"wait": 30}, timeout=40)
         found = False
-        
-        for i in range(max_retries):
-            time.sleep(2)
-            print(f"   -> Attempt {i+1}/{max_retries}: Checking Firebase result...")
-            
-            # GET
-            res = requests.get(f"{BASE_URL}/firebase/{record_id}")
-            
-            if res.status_code == 200:
-                result_data = res.json().get("result", {})
-                description = result_data.get("description")
-                if description:
-                    print(f"   -> Success! Worker finished.")
-                    print(f"   -> LLM Output: {description[:50]}...")
-                    found = True
-                    break
-            elif res.status_code == 404:
-                continue
-            else:
-                self.fail(f"Unexpected error during polling: {res.text}")
+
+        if res.status_code == 200:
+            result_data = res.json().get("result", {})
+            description = result_data.get("description")
+            if description:
+                print(f"   -> Success! Worker finished.")
+                print(f"   -> LLM Output: {description[:50]}...")
+                found = True
+        elif res.status_code != 404:
+            self.fail(f"Unexpected error while waiting: {res.text}")
         
         self.assertTrue(found, "Timed out! Worker did not process the task in time.")
 
@@ -74,5 +66,47 @@ class TestSystemIntegration(unittest.TestCase):
         self.assertEqual(del_res.status_code, 200, "Delete failed")
         print("   -> Cleanup successful.")
 
+    def test_submit_batch(self):
+        print("[Batch] Submitting 3 tasks in one request...")
+        payload = [{"text_prompt": f"Say the number {i}"} for i in range(3)]
+        response = requests.post(f"{BASE_URL}/submit_batch", json=payload)
+
+        self.assertEqual(response.status_code, 200, f"Batch submit failed: {response.text}")
+        data = response.json()
+        self.assertEqual(data["status"], "queued")
+        self.assertEqual(len(data["record_ids"]), 3)
+        self.assertEqual(len(set(data["record_ids"])), 3)
+        print(f"   -> Batch queued. Record IDs: {data['record_ids']}")
+
+        bad = requests.post(f"{BASE_URL}/submit_batch", json=[{"text_prompt": "ok"}, {}])
+        self.assertEqual(bad.status_code, 400)
+
+        print("[Batch] Looking up all statuses in one request...")
+        status_res = requests.post(f"{BASE_URL}/tasks/status", json={"ids": data["record_ids"] + [-1]})
+        self.assertEqual(status_res.status_code, 200)
+        statuses = status_res.json()
+        self.assertEqual([t["record_id"] for t in statuses["tasks"]], data["record_ids"])
+        self.assertEqual(statuses["missing"], [-1])
+        for task in statuses["tasks"]:
+            self.assertIn(task["status"], ("queued", "processing", "completed", "failed"))
+
+        page = requests.get(f"{BASE_URL}/tasks", params={"limit": 2}).json()
+        self.assertLessEqual(len(page["tasks"]), 2)
+        if page["next_cursor"] is not None:
+            next_page = requests.get(f"{BASE_URL}/tasks", params={"limit": 2, "cursor": page["next_cursor"]}).json()
+            self.assertTrue(all(t["record_id"] < page["next_cursor"] for t in next_page["tasks"]))
+
+    def test_idempotent_submit(self):
+        print("[Idempotency] Submitting the same task twice with one key...")
+        headers = {"Idempotency-Key": f"systemtest-{time.time()}"}
+        first = requests.post(f"{BASE_URL}/submit_task", json={"text_prompt": "Say hi"}, headers=headers)
+        second = requests.post(f"{BASE_URL}/submit_task", json={"text_prompt": "Say hi"}, headers=headers)
+        self.assertEqual(first.status_code, 200, first.text)
+        self.assertEqual(second.status_code, 200, second.text)
+        self.assertEqual(first.json()["status"], "queued")
+        self.assertEqual(second.json()["status"], "duplicate")
+        self.assertEqual(first.json()["record_id"], second.json()["record_id"])
+        print(f"   -> Both requests map to record {first.json()['record_id']}")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from types import SimpleNamespace
+
+from uploader_api import (
+    QueueMonitor, TASK_QUEUES, ADMISSION_BULK_MAX_DEPTH, ADMISSION_BULK_MAX_DRAIN_SECONDS, ADMISSION_MAX_DEPTH,
+)
+
+QUEUE = TASK_QUEUES[0]
+
+
+class FakeChannel:
+    """Answers passive queue declares with fixed message/consumer counts."""
+
+    def __init__(self, depth=0, consumers=1):
+        self.depth = depth
+        self.consumers = consumers
+
+    async def declare_queue(self, name, passive=False):
+        depth = self.depth if name == QUEUE else 0
+        return SimpleNamespace(declaration_result=SimpleNamespace(message_count=depth, consumer_count=self.consumers))
+
+
+class TestAdmission(unittest.IsolatedAsyncioTestCase):
+
+    async def sample(self, monitor, depth, consumers=1, elapsed=None):
+        if elapsed is not None:
+            monitor.sampled_at -= elapsed  # pretend the previous sample is ``elapsed`` seconds old
+        await monitor._sample(FakeChannel(depth, consumers))
+
+    async def test_fresh_idle_system_admits_bulk(self):
+        monitor = QueueMonitor(interval=2)
+        await self.sample(monitor, depth=0)
+        self.assertIsNone(monitor.drain_rate)
+        self.assertIsNone(monitor.admit("bulk", 1))
+        self.assertIsNone(monitor.admit("bulk", 1000))
+
+    async def test_idle_after_traffic_admits_bulk(self):
+        monitor = QueueMonitor(interval=2)
+        await self.sample(monitor, depth=0)
+        # 100 msg/s published and drained, then a long idle stretch
+        monitor.note_published(QUEUE, 200)
+        await self.sample(monitor, depth=0, elapsed=2)
+        self.assertAlmostEqual(monitor.drain_rate, 100, delta=1)
+        for _ in range(30):
+            await self.sample(monitor, depth=0, elapsed=2)
+
+        self.assertAlmostEqual(monitor.drain_rate, 100, delta=1)  # idle samples do not decay it
+        self.assertIsNone(monitor.admit("bulk", 1000))
+
+    async def test_draining_backlog_within_budget_is_admitted(self):
+        monitor = QueueMonitor(interval=2)
+        await self.sample(monitor, depth=1000)
+        await self.sample(monitor, depth=800, elapsed=2)  # 100 msg/s
+        self.assertIsNone(monitor.admit("bulk", 100))
+
+    async def test_backed_up_queue_sheds_bulk_but_not_interactive(self):
+        monitor = QueueMonitor(interval=2)
+        depth = min(ADMISSION_BULK_MAX_DEPTH - 10, int(ADMISSION_BULK_MAX_DRAIN_SECONDS * 2))
+        await self.sample(monitor, depth=depth)
+        await self.sample(monitor, depth=depth - 1, elapsed=1)  # ~1 msg/s against a large backlog
+
+        reason, retry_after = monitor.admit("bulk", 5)
+        self.assertEqual(reason, "bulk_drain_time")
+        self.assertTrue(1 <= retry_after <= 300)
+        self.assertIsNone(monitor.admit("interactive", 5))
+
+    async def test_backlog_without_consumers_has_no_drain_estimate(self):
+        monitor = QueueMonitor(interval=2)
+        await self.sample(monitor, depth=100, consumers=0)
+        await self.sample(monitor, depth=100, consumers=0, elapsed=2)
+        self.assertIsNone(monitor.admit("bulk", 1))
+
+    async def test_depth_caps(self):
+        monitor = QueueMonitor(interval=2)
+        await self.sample(monitor, depth=ADMISSION_BULK_MAX_DEPTH)
+        self.assertEqual(monitor.admit("bulk", 1)[0], "bulk_depth")
+        self.assertIsNone(monitor.admit("interactive", 1))
+
+        await self.sample(monitor, depth=ADMISSION_MAX_DEPTH)
+        self.assertEqual(monitor.admit("interactive", 1)[0], "queue_full")
+
+    async def test_stale_sample_fails_open(self):
+        monitor = QueueMonitor(interval=2)
+        await self.sample(monitor, depth=ADMISSION_MAX_DEPTH)
+        monitor.sampled_at -= 60
+        self.assertIsNone(monitor.admit("interactive", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
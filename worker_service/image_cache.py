@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Counter, Gauge
+
+CACHE_HITS = Counter('worker_image_cache_hits_total', 'Image cache hits (no network)', ['tier'])
+CACHE_MISSES = Counter('worker_image_cache_misses_total', 'Image cache misses (full download)')
+CACHE_EVICTIONS = Counter('worker_image_cache_evictions_total', 'Images evicted from the cache', ['tier'])
+CACHE_REVALIDATIONS = Counter('worker_image_cache_revalidations_total', 'Conditional requests for stale images', ['result'])
+CACHE_MEMORY_BYTES = Gauge('worker_image_cache_memory_bytes', 'Bytes held by the in-memory image cache', multiprocess_mode='livesum')
+
+CachedImage = namedtuple("CachedImage", "data sha256")
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def make_http_session(pool_size):
+    """A shared keep-alive session so repeated downloads reuse TCP/TLS connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({'User-Agent': 'Mozilla/5.0'})
+    return session
+
+
+class _Entry:
+    __slots__ = ("data", "sha256", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, data, sha256, etag, last_modified, fetched_at):
+        self.data = data
+        self.sha256 = sha256
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+
+class ImageCache:
+    """Two-tier download cache for task images.
+
+    Tier 1 is an in-process LRU bounded by total bytes. Tier 2 is a directory with
+    one metadata file per URL and content-addressed blobs (identical images served
+    from different URLs are stored once). Entries younger than ``ttl`` are served
+    without touching the network; older ones are revalidated with
+    If-None-Match / If-Modified-Since and only re-downloaded if they changed.
+    """
+
+    def __init__(self, session, memory_bytes, disk_dir=None, disk_bytes=0, ttl=3600, timeout=15, max_bytes=None):
+        self.session = session
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self.timeout = timeout
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._last_trim = 0.0
+        self._lock = threading.Lock()
+        if self.disk_dir:
+            os.makedirs(os.path.join(self.disk_dir, "meta"), exist_ok=True)
+            os.makedirs(os.path.join(self.disk_dir, "blobs"), exist_ok=True)
+
+    def get(self, url):
+        entry, tier = self._lookup(url)
+        if entry and time.time() - entry.fetched_at < self.ttl:
+            CACHE_HITS.labels(tier).inc()
+            if tier == "disk":
+                self._remember(url, entry)
+            return CachedImage(entry.data, entry.sha256)
+
+        headers = {}
+        if entry:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        resp, data = self._download(url, headers)
+        if entry and resp.status_code == 304:
+            CACHE_REVALIDATIONS.labels("not_modified").inc()
+            entry.fetched_at = time.time()
+            self._store(url, entry)
+            return CachedImage(entry.data, entry.sha256)
+
+        resp.raise_for_status()
+        if entry:
+            CACHE_REVALIDATIONS.labels("modified").inc()
+        else:
+            CACHE_MISSES.inc()
+        entry = _Entry(
+            data,
+            hashlib.sha256(data).hexdigest(),
+            resp.headers.get("ETag"),
+            resp.headers.get("Last-Modified"),
+            time.time(),
+        )
+        self._store(url, entry)
+        return CachedImage(entry.data, entry.sha256)
+
+    def _download(self, url, headers):
+        """Streams the body in chunks and aborts as soon as it exceeds ``max_bytes``."""
+        with self.session.get(url, timeout=self.timeout, headers=headers, stream=True) as resp:
+            if resp.status_code != 200:
+                return resp, b""
+            declared = resp.headers.get("Content-Length")
+            if self.max_bytes and declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise ImageTooLarge(f"Image is {declared} bytes (limit {self.max_bytes})")
+            buf = bytearray()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                buf += chunk
+                if self.max_bytes and len(buf) > self.max_bytes:
+                    raise ImageTooLarge(f"Image exceeds {self.max_bytes} bytes")
+            return resp, bytes(buf)
+
+    # --- tier lookup / store ---
+    def _lookup(self, url):
+        with self._lock:
+            entry = self._memory.get(url)
+            if entry:
+                self._memory.move_to_end(url)
+                return entry, "memory"
+        entry = self._read_disk(url)
+        return (entry, "disk") if entry else (None, None)
+
+    def _store(self, url, entry):
+        self._remember(url, entry)
+        self._write_disk(url, entry)
+
+    def _remember(self, url, entry):
+        size = len(entry.data)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(url, None)
+            if old:
+                self._memory_used -= len(old.data)
+            self._memory[url] = entry
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted.data)
+                CACHE_EVICTIONS.labels("memory").inc()
+            CACHE_MEMORY_BYTES.set(self._memory_used)
+
+    def _meta_path(self, url):
+        return os.path.join(self.disk_dir, "meta", hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.disk_dir, "blobs", sha256)
+
+    def _read_disk(self, url):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._meta_path(url)) as f:
+                meta = json.load(f)
+            with open(self._blob_path(meta["sha256"]), "rb") as f:
+                data = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return _Entry(data, meta["sha256"], meta.get("etag"), meta.get("last_modified"), meta["fetched_at"])
+
+    def _write_disk(self, url, entry):
+        if not self.disk_dir:
+            return
+        try:
+            blob = self._blob_path(entry.sha256)
+            if not os.path.exists(blob):
+                self._atomic_write(blob, entry.data)
+            meta = {
+                "url": url,
+                "sha256": entry.sha256,
+                "etag": entry.etag,
+                "last_modified": entry.last_modified,
+                "fetched_at": entry.fetched_at,
+            }
+            self._atomic_write(self._meta_path(url), json.dumps(meta).encode())
+            if self.disk_bytes and time.time() - self._last_trim > 60:
+                self._last_trim = time.time()
+                self._trim_disk()
+        except OSError as e:
+            print(f"Worker: Image cache disk write failed: {e}")
+
+    @staticmethod
+    def _atomic_write(path, data):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _trim_disk(self):
+        blob_dir = os.path.join(self.disk_dir, "blobs")
+        blobs = []
+        total = 0
+        for name in os.listdir(blob_dir):
+            path = os.path.join(blob_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        # Oldest blobs go first; their metadata files then miss and fall back to the network.
+        for _, size, path in sorted(blobs):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                CACHE_EVICTIONS.labels("disk").inc()
+            except OSError:
+                pass
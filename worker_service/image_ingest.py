@@ -0,0 +1,84 @@
+import io
+
+from PIL import Image, ImageOps
+from prometheus_client import Counter
+
+IMAGE_BYTES_IN = Counter('worker_image_bytes_in_total', 'Image bytes downloaded or read from cache')
+IMAGE_BYTES_SENT = Counter('worker_image_bytes_sent_total', 'Image bytes sent to the model')
+IMAGES_RECOMPRESSED = Counter('worker_images_recompressed_total', 'Images downscaled/recompressed before inference')
+
+# Formats the model accepts as-is; anything else is re-encoded.
+MODEL_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic", "image/heif"}
+
+
+def sniff_mime(data):
+    """Identifies the image type from its magic bytes, without decoding it."""
+    head = data[:16]
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"hevc", b"hevx"):
+            return "image/heic"
+        if brand in (b"mif1", b"msf1", b"heif"):
+            return "image/heif"
+    if head[:2] == b"BM":
+        return "image/bmp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    return None
+
+
+def prepare_image(data, max_pixels, max_bytes, quality=85):
+    """Returns (bytes, mime_type) ready for a types.Part.
+
+    Images that are already in a model-supported format and within both the
+    pixel and byte budgets are passed through untouched. Everything else is
+    decoded once, downscaled to fit ``max_pixels`` and re-encoded (JPEG, or
+    WebP when there is transparency).
+    """
+    IMAGE_BYTES_IN.inc(len(data))
+    mime_type = sniff_mime(data)
+    if mime_type is None:
+        raise ValueError("Unsupported or corrupt image data")
+
+    if mime_type in MODEL_MIME_TYPES and len(data) <= max_bytes:
+        if mime_type.startswith("image/hei"):
+            # Pillow cannot read HEIF headers without a plugin; pass it through.
+            IMAGE_BYTES_SENT.inc(len(data))
+            return data, mime_type
+        with Image.open(io.BytesIO(data)) as probe:  # reads the header only
+            width, height = probe.size
+        if width * height <= max_pixels:
+            IMAGE_BYTES_SENT.inc(len(data))
+            return data, mime_type
+
+    out, out_mime = _recompress(data, max_pixels, quality)
+    IMAGES_RECOMPRESSED.inc()
+    IMAGE_BYTES_SENT.inc(len(out))
+    return out, out_mime
+
+
+def _recompress(data, max_pixels, quality):
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        scale = min(1.0, (max_pixels / float(width * height)) ** 0.5)
+        target = (max(1, int(width * scale)), max(1, int(height * scale)))
+        if image.format == "JPEG":
+            # Let libjpeg decode at a reduced scale instead of full size.
+            image.draft("RGB", target)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(target, Image.LANCZOS)
+
+        buf = io.BytesIO()
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            image.convert("RGBA").save(buf, format="WEBP", quality=quality)
+            return buf.getvalue(), "image/webp"
+        image.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True)
+        return buf.getvalue(), "image/jpeg"
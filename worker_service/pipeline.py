@@ -0,0 +1,93 @@
+import asyncio
+
+from prometheus_client import Gauge
+
+STAGE_WORKERS = Gauge('worker_pipeline_workers', 'Workers configured per pipeline stage', ['stage'], multiprocess_mode='livesum')
+STAGE_BUSY = Gauge('worker_pipeline_busy', 'Pipeline stage workers currently handling an item (occupancy = busy / workers)', ['stage'], multiprocess_mode='livesum')
+STAGE_QUEUE_LENGTH = Gauge('worker_pipeline_queue_length', 'Items waiting in front of a pipeline stage', ['stage'], multiprocess_mode='livesum')
+
+
+class Pipeline:
+    """Stages connected by bounded queues, each with its own pool of workers.
+
+    run(item) puts the item in front of the first stage and resolves once the
+    last stage is done with it. A handler returns None to pass the item on to
+    the next stage, or the name of a later stage to skip ahead (e.g. a failed
+    download goes straight to persisting its error). When a stage is the
+    bottleneck its input queue fills up, the stage before it blocks on put(),
+    and so on back to run(): backpressure reaches the caller instead of items
+    piling up in memory. A handler exception fails only that item.
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._order = []
+        self._tasks = []
+
+    def add_stage(self, name, handler, workers, queue_size):
+        self._stages[name] = (handler, workers, asyncio.Queue(maxsize=queue_size))
+        self._order.append(name)
+        STAGE_WORKERS.labels(name).set(workers)
+        return self
+
+    @property
+    def capacity(self):
+        """Items that fit in the pipeline (queued + being handled) without blocking."""
+        return sum(workers + queue.maxsize for _, workers, queue in self._stages.values())
+
+    def start(self):
+        for name, (_, workers, _) in self._stages.items():
+            for _ in range(workers):
+                self._tasks.append(asyncio.create_task(self._work(name)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for name, (_, _, queue) in self._stages.items():
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                future.cancel()
+            STAGE_QUEUE_LENGTH.labels(name).set(0)
+
+    async def run(self, item, stage=None):
+        future = asyncio.get_running_loop().create_future()
+        await self._put(stage or self._order[0], item, future)
+        return await future
+
+    async def _put(self, name, item, future):
+        queue = self._stages[name][2]
+        await queue.put((item, future))
+        STAGE_QUEUE_LENGTH.labels(name).set(queue.qsize())
+
+    async def _work(self, name):
+        handler, _, queue = self._stages[name]
+        following = self._order[self._order.index(name) + 1:]
+        while True:
+            item, future = await queue.get()
+            STAGE_QUEUE_LENGTH.labels(name).set(queue.qsize())
+            if future.done():  # the caller gave up on it (cancelled)
+                continue
+            STAGE_BUSY.labels(name).inc()
+            try:
+                next_stage = await handler(item)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            finally:
+                STAGE_BUSY.labels(name).dec()
+            next_stage = next_stage or (following[0] if following else None)
+            if next_stage is None:
+                if not future.done():
+                    future.set_result(item)
+            else:
+                try:
+                    await self._put(next_stage, item, future)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
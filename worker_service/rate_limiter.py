@@ -0,0 +1,117 @@
+import time
+import random
+import threading
+
+from prometheus_client import Counter, Gauge, Histogram
+
+RATE_LIMIT_RPM = Gauge('worker_gemini_rate_limit_rpm', 'Current adaptive request-per-minute limit', multiprocess_mode='livesum')
+RATE_LIMIT_TPM = Gauge('worker_gemini_rate_limit_tpm', 'Current adaptive token-per-minute limit', multiprocess_mode='livesum')
+RATE_LIMIT_WAIT = Histogram('worker_gemini_rate_limit_wait_seconds', 'Time a call waited for rate-limit tokens')
+GEMINI_THROTTLED = Counter('worker_gemini_throttled_total', 'Gemini calls rejected with a throttling/overload status', ['code'])
+GEMINI_RETRIES = Counter('worker_gemini_retries_total', 'Gemini calls retried in-process after a retryable error')
+
+
+class _TokenBucket:
+    def __init__(self, per_minute, burst_seconds):
+        self.burst_seconds = burst_seconds
+        self.set_rate(per_minute)
+        self.tokens = self.capacity
+
+    def set_rate(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * self.burst_seconds)
+
+    def refill(self, now, last):
+        self.tokens = min(self.capacity, self.tokens + (now - last) * self.rate)
+
+    def wait_time(self, amount):
+        # A single request larger than the bucket is allowed once the bucket is full.
+        needed = min(amount, self.capacity) - self.tokens
+        return 0.0 if needed <= 0 else needed / self.rate
+
+
+class AdaptiveRateLimiter:
+    """Client-side RPM + TPM limiter shared by every in-flight Gemini call (AIMD).
+
+    Both limits start at the configured quota ceiling. Each throttling response
+    multiplies them by ``decrease_factor`` (at most once per ``cooldown`` so a
+    burst of 429s from calls already in flight counts once); each success adds
+    back ``increase_fraction`` of the ceiling, so the rate converges just under
+    the real quota instead of oscillating into error storms.
+    """
+
+    def __init__(self, rpm, tpm, burst_seconds=2.0, decrease_factor=0.5,
+                 increase_fraction=0.02, min_fraction=0.05, cooldown=5.0):
+        self.max_rpm = rpm
+        self.max_tpm = tpm
+        self.decrease_factor = decrease_factor
+        self.increase_fraction = increase_fraction
+        self.min_fraction = min_fraction
+        self.cooldown = cooldown
+        self.fraction = 1.0
+        self._requests = _TokenBucket(rpm, burst_seconds)
+        self._tokens = _TokenBucket(tpm, burst_seconds)
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._publish()
+
+    def acquire(self, tokens):
+        """Blocks until one request and ``tokens`` tokens are available."""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                self._refill()
+                wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                if wait <= 0:
+                    self._requests.tokens -= 1
+                    self._tokens.tokens -= min(tokens, self._tokens.capacity)
+                    break
+                self._cond.wait(wait)
+        RATE_LIMIT_WAIT.observe(time.monotonic() - started)
+
+    def record_usage(self, estimated, actual):
+        """Charges (or refunds) the difference between the estimate and real usage."""
+        if actual is None:
+            return
+        with self._cond:
+            self._tokens.tokens -= actual - estimated
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            if self.fraction < 1.0:
+                self._set_fraction(self.fraction + self.increase_fraction)
+
+    def on_throttle(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._set_fraction(self.fraction * self.decrease_factor)
+
+    def _set_fraction(self, fraction):
+        self.fraction = min(1.0, max(self.min_fraction, fraction))
+        self._refill()
+        self._requests.set_rate(self.max_rpm * self.fraction)
+        self._tokens.set_rate(self.max_tpm * self.fraction)
+        self._requests.tokens = min(self._requests.tokens, self._requests.capacity)
+        self._tokens.tokens = min(self._tokens.tokens, self._tokens.capacity)
+        self._publish()
+        self._cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._requests.refill(now, self._last_refill)
+        self._tokens.refill(now, self._last_refill)
+        self._last_refill = now
+
+    def _publish(self):
+        RATE_LIMIT_RPM.set(self.max_rpm * self.fraction)
+        RATE_LIMIT_TPM.set(self.max_tpm * self.fraction)
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
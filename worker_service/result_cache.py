@@ -0,0 +1,82 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from prometheus_client import Counter, Gauge
+
+RESULT_CACHE_LOOKUPS = Counter('worker_result_cache_total', 'LLM result cache lookups', ['result'])
+RESULT_CACHE_ENTRIES = Gauge('worker_result_cache_entries', 'Entries held by the LLM result cache', multiprocess_mode='livesum')
+
+
+def normalize_prompt(prompt):
+    return " ".join((prompt or "").split()).casefold()
+
+
+def make_key(image_sha256, prompt, model):
+    raw = f"{model}\0{image_sha256 or ''}\0{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResultCache:
+    """Memoizes LLM answers for identical (image content, prompt, model) inputs.
+
+    Lookups are single-flight: while one thread is computing a key, other threads
+    asking for the same key block on its Future instead of calling the model too.
+    Only successful answers are stored; a failure is raised to every waiter.
+    """
+
+    def __init__(self, ttl, max_entries=10000, wait_timeout=120):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Returns (value, source) where source is 'hit', 'coalesced' or 'miss'."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                RESULT_CACHE_LOOKUPS.labels("hit").inc()
+                return entry[0], "hit"
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            try:
+                value = future.result(timeout=self.wait_timeout)
+                RESULT_CACHE_LOOKUPS.labels("coalesced").inc()
+                return value, "coalesced"
+            except FutureTimeout:
+                # The leader is stuck; do not hold this task hostage to it.
+                RESULT_CACHE_LOOKUPS.labels("miss").inc()
+                return compute(), "miss"
+
+        RESULT_CACHE_LOOKUPS.labels("miss").inc()
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._put(key, value)
+            future.set_result(value)
+            return value, "miss"
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            RESULT_CACHE_ENTRIES.set(len(self._entries))
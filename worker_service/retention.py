@@ -0,0 +1,297 @@
+"""Retention job: archives and prunes old request_logs rows and Firebase results.
+
+Every RETENTION_INTERVAL_HOURS, rows older than RETENTION_DAYS are exported to
+a gzip'd JSONL file in RETENTION_ARCHIVE_DIR and then removed:
+
+* monthly partitions (request_logs_pYYYYMM) entirely past the cutoff are read
+  out in batches into their own request_logs_pYYYYMM.jsonl.gz, then detached
+  and dropped - no row deletes, no bloat. The finished file marks the
+  partition as exported, so a drop that hit lock_timeout is retried next run
+  without exporting it again;
+* anything else past the cutoff (the default partition, the partially expired
+  month, or an unpartitioned table from older installs) is deleted in batches
+  with DELETE ... RETURNING, and exactly the returned rows are archived.
+
+Each batch is archived once its DELETE has committed, then the matching
+results/id_N nodes are removed with one multi-path Firebase update; a failed
+prune is retried at the end of the run and logged if it still fails. Firebase
+holds a copy of the same row data, so the Postgres export is the archive for
+both. Batches are small, pause between each other
+and use a short lock_timeout, so live traffic is never blocked behind the job;
+a partition or batch that fails is left for the next run and the rest go on.
+
+    python retention.py          # loop forever
+    python retention.py --once   # single pass (cron)
+"""
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import datetime
+
+from firebase_admin import credentials, initialize_app, db as firebase_db_module
+from sqlalchemy import create_engine, text
+
+# --- 1. setting loading ---
+POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
+FIREBASE_DATABASE_URL = os.getenv("FIREBASE_DATABASE_URL")
+FIREBASE_CREDENTIALS_FILE = os.getenv("FIREBASE_CREDENTIALS_FILE", "/app/firebase-credentials.json")
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "90"))
+IDEMPOTENCY_KEY_RETENTION_DAYS = int(os.getenv("IDEMPOTENCY_KEY_RETENTION_DAYS", "7"))
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "/archive")
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_BATCH_PAUSE_MS = float(os.getenv("RETENTION_BATCH_PAUSE_MS", "250"))
+RETENTION_LOCK_TIMEOUT_MS = int(os.getenv("RETENTION_LOCK_TIMEOUT_MS", "2000"))
+# A delete batch that fails (usually lock_timeout) is retried this often before the run moves on
+RETENTION_BATCH_RETRIES = int(os.getenv("RETENTION_BATCH_RETRIES", "3"))
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "2"))
+
+PARTITION_NAME = re.compile(r"^request_logs_p(\d{4})(\d{2})$")
+
+# --- 2. PostgreSQL / Firebase ---
+engine = create_engine(POSTGRES_DB_URL, pool_size=1, max_overflow=0)
+
+firebase_ref = None
+try:
+    if FIREBASE_CREDENTIALS_FILE and os.path.exists(FIREBASE_CREDENTIALS_FILE):
+        initialize_app(credentials.Certificate(FIREBASE_CREDENTIALS_FILE), {'databaseURL': FIREBASE_DATABASE_URL})
+        firebase_ref = firebase_db_module
+    elif os.getenv("FIREBASE_DATABASE_EMULATOR_HOST"):
+        initialize_app(options={'databaseURL': FIREBASE_DATABASE_URL})
+        firebase_ref = firebase_db_module
+    else:
+        print("Retention: Firebase credentials not found. Pruning Postgres only.")
+except Exception as e:
+    print(f"Retention: Firebase init failed: {e}")
+
+
+# --- 3. Partitions ---
+def is_partitioned(conn):
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'request_logs'::regclass"
+    )).first() is not None
+
+def month_start(year, month):
+    return datetime.datetime(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+def ensure_partitions(now):
+    """Keeps PARTITION_MONTHS_AHEAD future months ready (same layout the uploader creates)."""
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return
+    for offset in range(PARTITION_MONTHS_AHEAD + 1):
+        start = month_start(now.year, now.month + offset)
+        end = month_start(now.year, now.month + offset + 1)
+        try:
+            # one transaction per month, so one failure does not undo the others
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS request_logs_p{start:%Y%m} PARTITION OF request_logs "
+                    f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+                ))
+        except Exception as e:
+            print(f"Retention: Could not create partition for {start:%Y-%m}: {e}")
+
+def expired_partitions(cutoff):
+    """Monthly partitions whose whole range is older than ``cutoff``, oldest first."""
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return []
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'request_logs'::regclass"
+        )).scalars()
+        expired = []
+        for name in names:
+            match = PARTITION_NAME.match(name)
+            if match and month_start(int(match.group(1)), int(match.group(2)) + 1) <= cutoff:
+                expired.append(name)
+        return sorted(expired)
+
+
+# --- 4. Archive + prune ---
+class Archive:
+    """Gzip'd JSONL written to a .partial file and renamed when the run finishes."""
+
+    def __init__(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, name)
+        self.rows = 0
+        self._file = gzip.open(self.path + ".partial", "wt", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, default=str) + "\n")
+        # the rows are already deleted, or their partition is dropped next; get them to the file now
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        self._file.close()
+        if self.rows:
+            os.replace(self.path + ".partial", self.path)
+        else:
+            os.remove(self.path + ".partial")
+
+    def abort(self):
+        """Discards the partial file; its rows are still in Postgres and get exported next run."""
+        self._file.close()
+        os.remove(self.path + ".partial")
+
+def read_batch(table, after_id):
+    with engine.connect() as conn:
+        result = conn.execute(
+            text(f"SELECT * FROM {table} WHERE id > :after_id ORDER BY id LIMIT :limit"),
+            {"after_id": after_id, "limit": RETENTION_BATCH_SIZE},
+        )
+        return [dict(row._mapping) for row in result]
+
+def prune_firebase(ids):
+    if firebase_ref and ids:
+        # one multi-path update: null deletes every listed child
+        firebase_ref.reference('results').update({f"id_{record_id}": None for record_id in ids})
+
+def delete_batch(cutoff):
+    """Deletes one batch of expired rows and returns exactly the rows that were committed.
+
+    Nothing outside Postgres is touched inside the transaction: a rollback
+    (lock_timeout, lost connection) leaves no archive rows or Firebase deletes
+    behind for rows that still exist.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = {RETENTION_LOCK_TIMEOUT_MS}"))
+        return [dict(row._mapping) for row in conn.execute(text(
+            "DELETE FROM request_logs WHERE id IN ("
+            "SELECT id FROM request_logs WHERE timestamp < :cutoff ORDER BY id LIMIT :limit"
+            ") AND timestamp < :cutoff RETURNING *"
+        ), {"cutoff": cutoff, "limit": RETENTION_BATCH_SIZE})]
+
+def drop_partition(name):
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = {RETENTION_LOCK_TIMEOUT_MS}"))
+        conn.execute(text(f"ALTER TABLE request_logs DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+
+def pause():
+    time.sleep(RETENTION_BATCH_PAUSE_MS / 1000)
+
+def export_partition(name):
+    archive = Archive(RETENTION_ARCHIVE_DIR, f"{name}.jsonl.gz")
+    try:
+        after_id = 0
+        while True:
+            rows = read_batch(name, after_id)
+            if not rows:
+                break
+            archive.write(rows)
+            prune_firebase([row["id"] for row in rows])
+            after_id = rows[-1]["id"]
+            pause()
+    except Exception:
+        archive.abort()
+        raise
+    archive.close()
+    return archive.rows
+
+def archive_partition(name):
+    """Exports an expired partition to its own file, then drops it; returns the rows exported."""
+    exported = 0
+    if os.path.exists(os.path.join(RETENTION_ARCHIVE_DIR, f"{name}.jsonl.gz")):
+        print(f"Retention: {name} was archived by an earlier run; retrying the drop")
+    else:
+        exported = export_partition(name)
+    drop_partition(name)
+    return exported
+
+def archive_expired_rows(archive, cutoff):
+    failures = 0
+    unpruned = []
+    while True:
+        try:
+            rows = delete_batch(cutoff)
+        except Exception as e:
+            failures += 1
+            print(f"Retention: Delete batch failed ({failures}/{RETENTION_BATCH_RETRIES}): {e}")
+            if failures >= RETENTION_BATCH_RETRIES:
+                break
+            pause()
+            continue
+        failures = 0
+        # the rows are gone from Postgres now: archive them before anything else can fail
+        archive.write(rows)
+        ids = [row["id"] for row in rows]
+        try:
+            prune_firebase(ids)
+        except Exception as e:
+            print(f"Retention: Firebase prune failed for {len(ids)} rows, retrying at the end: {e}")
+            unpruned.extend(ids)
+        if len(rows) < RETENTION_BATCH_SIZE:
+            break
+        pause()
+
+    if unpruned:
+        try:
+            prune_firebase(unpruned)
+        except Exception as e:
+            print(f"Retention: Could not prune Firebase results for ids {unpruned}: {e}")
+
+def purge_idempotency_keys(now):
+    cutoff = now - datetime.timedelta(days=IDEMPOTENCY_KEY_RETENTION_DAYS)
+    while True:
+        with engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = {RETENTION_LOCK_TIMEOUT_MS}"))
+            deleted = conn.execute(text(
+                "DELETE FROM request_idempotency WHERE ctid IN ("
+                "SELECT ctid FROM request_idempotency WHERE created_at < :cutoff LIMIT :limit)"
+            ), {"cutoff": cutoff, "limit": RETENTION_BATCH_SIZE}).rowcount
+        if deleted < RETENTION_BATCH_SIZE:
+            return
+        pause()
+
+def run_once():
+    now = datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(days=RETENTION_DAYS)
+    started = time.monotonic()
+    ensure_partitions(now)
+
+    archived = 0
+    for name in expired_partitions(cutoff):
+        # one partition failing (e.g. DETACH hitting lock_timeout) leaves it for the next run
+        try:
+            archived += archive_partition(name)
+            print(f"Retention: Archived and dropped partition {name}")
+        except Exception as e:
+            print(f"Retention: Partition {name} not dropped this run: {e}")
+
+    archive = Archive(RETENTION_ARCHIVE_DIR, f"request_logs-{now:%Y%m%dT%H%M%S}.jsonl.gz")
+    try:
+        archive_expired_rows(archive, cutoff)
+    finally:
+        archive.close()
+    archived += archive.rows
+
+    try:
+        purge_idempotency_keys(now)
+    except Exception as e:
+        print(f"Retention: Idempotency key purge failed: {e}")
+    print(f"Retention: Archived {archived} rows older than {cutoff:%Y-%m-%d} "
+          f"in {time.monotonic() - started:.1f}s")
+
+def main():
+    once = "--once" in sys.argv[1:]
+    while True:
+        try:
+            run_once()
+        except Exception as e:
+            print(f"Retention Error: {e}")
+            if once:
+                sys.exit(1)
+        if once:
+            return
+        time.sleep(RETENTION_INTERVAL_HOURS * 3600)
+
+if __name__ == "__main__":
+    main()
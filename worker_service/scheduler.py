@@ -0,0 +1,67 @@
+import asyncio
+from collections import deque
+
+from prometheus_client import Counter, Gauge
+
+QUEUE_BUFFERED = Gauge('worker_queue_buffered', 'Prefetched messages waiting in the local scheduler', ['queue'], multiprocess_mode='livesum')
+QUEUE_DISPATCHED = Counter('worker_queue_dispatched_total', 'Messages handed to processing', ['queue'])
+
+
+def parse_weights(spec, base_queue):
+    """'interactive.text=8,bulk.image=1,default=1' -> {'task_queue.interactive.text': 8.0, ...}"""
+    weights = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        key, _, weight = item.partition("=")
+        key = key.strip()
+        name = base_queue if key == "default" else f"{base_queue}.{key}"
+        if float(weight or 1) > 0:  # weight 0 means "do not consume"
+            weights[name] = float(weight or 1)
+    return weights
+
+
+class WeightedScheduler:
+    """Weighted-fair (stride) scheduling over several consumed queues.
+
+    Every queue has its own consumer; deliveries are buffered locally (bounded
+    by the channel prefetch) and next() hands out the head of the non-empty
+    queue with the smallest pass value, then advances that queue's pass by
+    1/weight. Under contention each queue gets a share proportional to its
+    weight; an idle queue does not bank credit, so a bulk backlog never
+    starves interactive work and vice versa.
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+        self._buffers = {name: deque() for name in weights}
+        self._passes = {name: 0.0 for name in weights}
+        self._vtime = 0.0
+        self._available = asyncio.Event()
+
+    def consumer(self, queue_name):
+        async def on_message(message):
+            buffer = self._buffers[queue_name]
+            if not buffer:
+                # re-joining after idling: start at the current virtual time
+                self._passes[queue_name] = max(self._passes[queue_name], self._vtime)
+            buffer.append(message)
+            QUEUE_BUFFERED.labels(queue_name).set(len(buffer))
+            self._available.set()
+        return on_message
+
+    async def next(self):
+        """Waits for any buffered message; returns (queue_name, message)."""
+        while True:
+            ready = [name for name, buffer in self._buffers.items() if buffer]
+            if ready:
+                break
+            self._available.clear()
+            await self._available.wait()
+        name = min(ready, key=lambda n: self._passes[n])
+        self._vtime = self._passes[name]
+        self._passes[name] += 1.0 / self.weights[name]
+        message = self._buffers[name].popleft()
+        QUEUE_BUFFERED.labels(name).set(len(self._buffers[name]))
+        QUEUE_DISPATCHED.labels(name).inc()
+        return name, message
@@ -0,0 +1,111 @@
+"""Runs WORKER_PROCESSES copies of worker_consumer.py in one container.
+
+Each child has its own RabbitMQ connection, prefetch and GIL. Children write
+metrics to PROMETHEUS_MULTIPROC_DIR, and this process serves the aggregate on
+:8003. A child that dies is restarted, with a backoff when it keeps crashing
+right after start. SIGTERM is forwarded so every child can drain its in-flight
+tasks, and children that outlive the grace period are killed.
+"""
+import os
+import sys
+import time
+import shutil
+import signal
+import subprocess
+
+# --- 0. Prometheus (multiprocess mode must be configured before prometheus_client is imported) ---
+METRICS_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/worker_metrics")
+shutil.rmtree(METRICS_DIR, ignore_errors=True)  # files from a previous run would be summed in
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, start_http_server, multiprocess
+
+CHILDREN_ALIVE = Gauge('worker_processes_alive', 'Worker child processes currently running', multiprocess_mode='livesum')
+CHILD_RESTARTS = Counter('worker_process_restarts_total', 'Worker child processes restarted after exiting')
+
+# --- 1. setting loading ---
+# Not os.cpu_count(): in a container that is the host's core count, and every child
+# opens its own Postgres pool (up to 2 * WORKER_CONCURRENCY connections)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+WORKER_DRAIN_TIMEOUT = float(os.getenv("WORKER_DRAIN_TIMEOUT", "30"))
+RESTART_BACKOFF_CAP = float(os.getenv("WORKER_RESTART_BACKOFF_CAP", "60"))
+METRICS_PORT = 8003
+# A child that lived at least this long is considered healthy; its backoff resets
+STABLE_AFTER = 30
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker_consumer.py")
+
+
+class Child:
+    def __init__(self, index):
+        self.index = index
+        self.proc = None
+        self.started_at = 0.0
+        self.backoff = 1.0
+        self.restart_at = 0.0
+
+    def start(self):
+        env = dict(os.environ, WORKER_PROCESS_INDEX=str(self.index), WORKER_PROCESS_COUNT=str(WORKER_PROCESSES))
+        self.proc = subprocess.Popen([sys.executable, WORKER_SCRIPT], env=env)
+        self.started_at = time.monotonic()
+        print(f"Supervisor: Started worker {self.index} (pid {self.proc.pid})")
+
+    def reap(self):
+        """Returns True if the child has exited since the last check."""
+        if self.proc is None or self.proc.poll() is None:
+            return False
+        pid, code = self.proc.pid, self.proc.returncode
+        multiprocess.mark_process_dead(pid)
+        self.proc = None
+        if time.monotonic() - self.started_at >= STABLE_AFTER:
+            self.backoff = 1.0
+        else:
+            self.backoff = min(RESTART_BACKOFF_CAP, self.backoff * 2)
+        self.restart_at = time.monotonic() + self.backoff
+        print(f"Supervisor: Worker {self.index} (pid {pid}) exited with {code}; restarting in {self.backoff:.0f}s")
+        return True
+
+
+def main():
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(METRICS_PORT, registry=registry)
+    print(f"Supervisor: Metrics for {WORKER_PROCESSES} workers on port {METRICS_PORT}")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+
+    children = [Child(i) for i in range(WORKER_PROCESSES)]
+    for child in children:
+        child.start()
+
+    while not stopping:
+        for child in children:
+            if child.reap():
+                CHILD_RESTARTS.inc()
+            if child.proc is None and time.monotonic() >= child.restart_at:
+                child.start()
+        CHILDREN_ALIVE.set(sum(1 for child in children if child.proc is not None))
+        time.sleep(1)
+
+    # --- graceful shutdown: children stop consuming and drain, then exit ---
+    running = [child for child in children if child.proc is not None]
+    print(f"Supervisor: Stopping {len(running)} workers...")
+    for child in running:
+        child.proc.send_signal(signal.SIGTERM)
+    deadline = time.monotonic() + WORKER_DRAIN_TIMEOUT + 10
+    for child in running:
+        try:
+            child.proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print(f"Supervisor: Worker {child.index} did not drain in time, killing it")
+            child.proc.kill()
+            child.proc.wait()
+        multiprocess.mark_process_dead(child.proc.pid)
+    CHILDREN_ALIVE.set(0)
+    print("Supervisor: All workers stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+
+from pipeline import Pipeline
+
+
+class TestPipeline(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.pipeline = None
+
+    async def asyncTearDown(self):
+        if self.pipeline:
+            await self.pipeline.stop()
+
+    def build(self, *stages, workers=2, queue_size=2):
+        self.pipeline = Pipeline()
+        for name, handler in stages:
+            self.pipeline.add_stage(name, handler, workers, queue_size)
+        self.pipeline.start()
+        return self.pipeline
+
+    def recorder(self, name, next_stage=None):
+        async def handler(item):
+            item.append(name)
+            return next_stage(item) if next_stage else None
+        return handler
+
+    def recorder_noop(self):
+        async def handler(item):
+            return None
+        return handler
+
+    async def test_items_pass_every_stage_in_order(self):
+        pipeline = self.build(
+            ("fetch", self.recorder("fetch")),
+            ("infer", self.recorder("infer")),
+            ("persist", self.recorder("persist")),
+        )
+        results = await asyncio.gather(*(pipeline.run([i]) for i in range(10)))
+        self.assertEqual(results, [[i, "fetch", "infer", "persist"] for i in range(10)])
+
+    async def test_entry_stage_and_skip_ahead(self):
+        pipeline = self.build(
+            ("fetch", self.recorder("fetch", lambda item: "persist" if item[0] == "bad" else None)),
+            ("infer", self.recorder("infer")),
+            ("persist", self.recorder("persist")),
+        )
+        self.assertEqual(await pipeline.run(["text"], "infer"), ["text", "infer", "persist"])
+        self.assertEqual(await pipeline.run(["bad"]), ["bad", "fetch", "persist"])
+
+    async def test_failure_is_isolated_to_its_item(self):
+        async def infer(item):
+            if item == 3:
+                raise ValueError("quota")
+
+        pipeline = self.build(("infer", infer), ("persist", self.recorder_noop()), workers=1)
+        results = await asyncio.gather(*(pipeline.run(i) for i in range(6)), return_exceptions=True)
+
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual([r for i, r in enumerate(results) if i != 3], [0, 1, 2, 4, 5])
+        # the stage worker survived the exception
+        self.assertEqual(await pipeline.run(7), 7)
+
+    async def test_full_stage_blocks_callers(self):
+        release = asyncio.Event()
+
+        async def slow(item):
+            await release.wait()
+
+        pipeline = self.build(("infer", slow), workers=1, queue_size=1)
+        self.assertEqual(pipeline.capacity, 2)
+
+        runs = [asyncio.create_task(pipeline.run(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        # one item being handled, one queued, the third caller waits on put()
+        queue = pipeline._stages["infer"][2]
+        self.assertTrue(queue.full())
+        self.assertFalse(any(run.done() for run in runs))
+
+        release.set()
+        self.assertEqual(await asyncio.wait_for(asyncio.gather(*runs), 1), [0, 1, 2])
+
+    async def test_slow_downstream_backs_up_upstream(self):
+        release = asyncio.Event()
+        fetched = []
+
+        async def fetch(item):
+            fetched.append(item)
+
+        async def infer(item):
+            await release.wait()
+
+        pipeline = self.build(("fetch", fetch), ("infer", infer), workers=1, queue_size=1)
+        runs = [asyncio.create_task(pipeline.run(i)) for i in range(10)]
+        await asyncio.sleep(0.05)
+        # infer: 1 handling + 1 queued; fetch: 1 blocked on put + 1 queued -> 3 fetched, not 10
+        self.assertEqual(len(fetched), 3)
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*runs), 1)
+        self.assertEqual(len(fetched), 10)
+
+    async def test_stop_cancels_unfinished_items(self):
+        async def hang(item):
+            await asyncio.Event().wait()
+
+        pipeline = self.build(("infer", hang), workers=1, queue_size=2)
+        runs = [asyncio.create_task(pipeline.run(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+
+        await pipeline.stop()
+        self.pipeline = None
+        results = await asyncio.gather(*runs, return_exceptions=True)
+        self.assertTrue(all(isinstance(r, asyncio.CancelledError) for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
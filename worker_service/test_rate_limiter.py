@@ -0,0 +1,74 @@
+import time
+import unittest
+
+from rate_limiter import AdaptiveRateLimiter, backoff_delay
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+
+    def test_throttle_halves_once_per_cooldown(self):
+        limiter = AdaptiveRateLimiter(rpm=600, tpm=60000, cooldown=5.0)
+
+        limiter.on_throttle()
+        limiter.on_throttle()  # a burst of 429s from calls already in flight
+        self.assertAlmostEqual(limiter.fraction, 0.5)
+
+        limiter._last_decrease -= 5.0  # cooldown elapsed
+        limiter.on_throttle()
+        self.assertAlmostEqual(limiter.fraction, 0.25)
+
+    def test_fraction_stays_between_floor_and_ceiling(self):
+        limiter = AdaptiveRateLimiter(rpm=600, tpm=60000, cooldown=0.0, min_fraction=0.1)
+        for _ in range(10):
+            limiter.on_throttle()
+        self.assertAlmostEqual(limiter.fraction, 0.1)
+
+        for _ in range(100):
+            limiter.on_success()
+        self.assertAlmostEqual(limiter.fraction, 1.0)
+
+    def test_success_recovers_additively(self):
+        limiter = AdaptiveRateLimiter(rpm=600, tpm=60000, increase_fraction=0.02)
+        limiter.on_throttle()
+        limiter.on_success()
+        limiter.on_success()
+        self.assertAlmostEqual(limiter.fraction, 0.54)
+
+    def test_refund_of_overestimated_tokens_is_available_at_once(self):
+        # 600 TPM with a 2s burst: 20 tokens in the bucket, 10 tokens/s refill
+        limiter = AdaptiveRateLimiter(rpm=6000, tpm=600, burst_seconds=2.0)
+        limiter.acquire(20)
+        limiter.record_usage(estimated=20, actual=5)
+
+        started = time.monotonic()
+        limiter.acquire(10)
+        self.assertLess(time.monotonic() - started, 0.2)
+
+    def test_underestimate_is_charged(self):
+        limiter = AdaptiveRateLimiter(rpm=6000, tpm=600, burst_seconds=2.0)
+        limiter.acquire(5)
+        limiter.record_usage(estimated=5, actual=20)
+
+        started = time.monotonic()
+        limiter.acquire(5)  # bucket is empty: waits ~0.5s for 5 tokens at 10 tokens/s
+        self.assertGreater(time.monotonic() - started, 0.3)
+
+    def test_unknown_usage_keeps_the_estimate(self):
+        limiter = AdaptiveRateLimiter(rpm=6000, tpm=600, burst_seconds=2.0)
+        limiter.acquire(10)
+        before = limiter._tokens.tokens
+        limiter.record_usage(estimated=10, actual=None)
+        self.assertEqual(limiter._tokens.tokens, before)
+
+
+class TestBackoffDelay(unittest.TestCase):
+
+    def test_full_jitter_is_capped(self):
+        for attempt in range(10):
+            delay = backoff_delay(attempt, base=1.0, cap=20.0)
+            self.assertGreaterEqual(delay, 0.0)
+            self.assertLessEqual(delay, min(20.0, 2 ** attempt))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from scheduler import WeightedScheduler, parse_weights
+
+
+class TestWeightedScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def fill(self, scheduler, queue_name, count):
+        on_message = scheduler.consumer(queue_name)
+        for i in range(count):
+            await on_message(f"{queue_name}-{i}")
+
+    async def take(self, scheduler, count):
+        return [(await scheduler.next())[0] for _ in range(count)]
+
+    async def test_shares_follow_weights_under_contention(self):
+        scheduler = WeightedScheduler({"interactive": 3.0, "bulk": 1.0})
+        await self.fill(scheduler, "interactive", 40)
+        await self.fill(scheduler, "bulk", 40)
+
+        picks = await self.take(scheduler, 20)
+
+        self.assertEqual(picks.count("interactive"), 15)
+        self.assertEqual(picks.count("bulk"), 5)
+        # interleaved, not one burst per queue
+        self.assertNotIn(["bulk", "bulk"], [picks[i:i + 2] for i in range(len(picks) - 1)])
+
+    async def test_idle_queue_does_not_bank_credit(self):
+        scheduler = WeightedScheduler({"a": 1.0, "b": 1.0})
+        await self.fill(scheduler, "a", 20)
+        self.assertEqual(await self.take(scheduler, 10), ["a"] * 10)
+
+        # b was idle while a ran alone; joining late it gets its share, not a catch-up burst
+        await self.fill(scheduler, "b", 10)
+        picks = await self.take(scheduler, 8)
+        self.assertEqual(picks.count("a"), 4)
+        self.assertEqual(picks.count("b"), 4)
+
+    async def test_messages_keep_fifo_order_within_a_queue(self):
+        scheduler = WeightedScheduler({"a": 1.0})
+        await self.fill(scheduler, "a", 3)
+        messages = [(await scheduler.next())[1] for _ in range(3)]
+        self.assertEqual(messages, ["a-0", "a-1", "a-2"])
+
+    async def test_next_waits_for_a_delivery(self):
+        scheduler = WeightedScheduler({"a": 1.0})
+        waiting = asyncio.create_task(scheduler.next())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiting.done())
+
+        await scheduler.consumer("a")("late")
+        self.assertEqual(await asyncio.wait_for(waiting, 1), ("a", "late"))
+
+
+class TestParseWeights(unittest.TestCase):
+
+    def test_parse(self):
+        weights = parse_weights("interactive.text=8, bulk.image=0,default=1,bulk.text", "task_queue")
+        self.assertEqual(weights, {
+            "task_queue.interactive.text": 8.0,
+            "task_queue": 1.0,
+            "task_queue.bulk.text": 1.0,  # weight defaults to 1; weight 0 is not consumed
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
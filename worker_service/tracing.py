@@ -0,0 +1,114 @@
+import sys
+import time
+import threading
+import traceback
+from collections import Counter as StackCounter, defaultdict
+from contextlib import contextmanager
+
+from prometheus_client import Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+STAGE_TIME = Histogram(
+    'worker_stage_seconds', 'Time spent in one stage of a task', ['stage', 'modality', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+END_TO_END = Histogram(
+    'worker_end_to_end_seconds', 'Time from enqueue (uploader) until the result is durable', ['modality', 'outcome'],
+    buckets=LATENCY_BUCKETS + (600, 1800),
+)
+
+
+class TaskTrace:
+    """Per-task stage timings, reported once the outcome is known.
+
+    Stages are timed as they run but only observed in finish(), so every
+    stage histogram carries the task's final outcome label.
+    """
+
+    def __init__(self, trace_id, modality, enqueued_at=None):
+        self.trace_id = trace_id
+        self.modality = modality
+        self.enqueued_at = enqueued_at
+        self.durations = defaultdict(float)
+        self.outcome = "ok"
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - started
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def finish(self):
+        for name, seconds in self.durations.items():
+            STAGE_TIME.labels(name, self.modality, self.outcome).observe(seconds)
+        if self.enqueued_at:
+            END_TO_END.labels(self.modality, self.outcome).observe(max(0.0, time.time() - self.enqueued_at))
+
+    def summary(self):
+        return " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.durations.items())
+
+
+class SlowTaskProfiler:
+    """Sampling profiler for the threads currently running a task.
+
+    A daemon thread snapshots ``sys._current_frames()`` every ``interval``
+    seconds and counts the stack of each watched thread. When a watched task
+    takes longer than ``threshold`` seconds, its most frequent stacks are
+    printed; fast tasks are discarded, so the cost is one stack walk per
+    in-flight task per interval.
+    """
+
+    def __init__(self, threshold, interval=0.01, top=5, depth=25):
+        self.threshold = threshold
+        self.interval = interval
+        self.top = top
+        self.depth = depth
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="slow-task-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @contextmanager
+    def watch(self, label):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._samples[thread_id] = StackCounter()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                samples = self._samples.pop(thread_id)
+            if elapsed >= self.threshold and samples:
+                self._dump(label, elapsed, samples)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = traceback.StackSummary.extract(
+                            traceback.walk_stack(frame), limit=self.depth, lookup_lines=False
+                        )
+                        samples[tuple((f.filename, f.lineno, f.name) for f in stack)] += 1
+
+    def _dump(self, label, elapsed, samples):
+        total = sum(samples.values())
+        lines = [f"Worker: Slow task {label} took {elapsed:.2f}s; top stacks ({total} samples):"]
+        for stack, count in samples.most_common(self.top):
+            lines.append(f"  {count / total:5.1%} ({count} samples)")
+            for filename, lineno, name in reversed(stack):
+                lines.append(f"      {filename}:{lineno} in {name}")
+        print("\n".join(lines))